@@ -10,7 +10,10 @@ DEFAULT_OUT = os.environ.get("THN_OUT_DIR", "./THN")
 FLASK_SECRET = os.environ.get("FLASK_SECRET")
 PORT = int(os.environ.get("PORT", 5000))
 
+DOWNLOAD_WORKERS = int(os.environ.get("DOWNLOAD_WORKERS", 8))
+
 RATE_LIMIT_FEED_CALLS = int(os.environ.get("RATE_LIMIT_FEED_CALLS", 10))
 RATE_LIMIT_WINDOW_SEC = int(os.environ.get("RATE_LIMIT_WINDOW_SEC", 60))
+FEED_CACHE_TTL_SEC = int(os.environ.get("FEED_CACHE_TTL_SEC", 60))
 
 ALLOW_ONLY_DEFAULT_FEED = os.environ.get("ALLOW_ONLY_DEFAULT_FEED", "1") not in ("0", "false", "False")
@@ -1,19 +1,91 @@
+import io
 import os
 import feedparser
+import urllib3
+from lxml import etree
+from time import monotonic
 from urllib.parse import urlparse
 
-from config import DEFAULT_FEED, RATE_LIMIT_FEED_CALLS, RATE_LIMIT_WINDOW_SEC, ALLOW_ONLY_DEFAULT_FEED
-from utils import RateLimiter
+from config import (DEFAULT_FEED, RATE_LIMIT_FEED_CALLS, RATE_LIMIT_WINDOW_SEC, ALLOW_ONLY_DEFAULT_FEED,
+                    FEED_CACHE_TTL_SEC)
+from utils import RateLimiter, raise_for_status
 
 
 _limiter = RateLimiter(RATE_LIMIT_FEED_CALLS, RATE_LIMIT_WINDOW_SEC)
 
+# feed URL -> (fetched_at, etag, modified, parsed feed)
+_feed_cache: dict[str, tuple[float, str | None, str | None, feedparser.FeedParserDict]] = {}
+_FEED_CACHE_MAX = 16
 
-def load_feed(feed_source: str):
+
+_MEDIA_NS = "{http://search.yahoo.com/mrss/}"
+_IMG_PREFIX = "image/"
+
+
+def _item_to_entry(item) -> feedparser.FeedParserDict:
+    entry = feedparser.FeedParserDict()
+    for tag, key in (("title", "title"), ("link", "link"), ("pubDate", "published"), ("description", "summary")):
+        text = item.findtext(tag)
+        if text is not None:
+            entry[key] = text.strip()
+
+    # Same shape feedparser produces: enclosures are derived from rel="enclosure" links.
+    links = []
+    if "link" in entry:
+        links.append(feedparser.FeedParserDict(rel="alternate", type="text/html", href=entry["link"]))
+    for enc in item.findall("enclosure"):
+        link = feedparser.FeedParserDict(rel="enclosure", href=enc.get("url"))
+        for attr in ("type", "length"):
+            if enc.get(attr) is not None:
+                link[attr] = enc.get(attr)
+        links.append(link)
+    entry["links"] = links
+
+    media = [feedparser.FeedParserDict(m.attrib) for m in item.iter(_MEDIA_NS + "content")]
+    if media:
+        entry["media_content"] = media
+    return entry
+
+
+def fast_parse(data: bytes) -> feedparser.FeedParserDict | None:
+    entries = []
+    try:
+        context = etree.iterparse(io.BytesIO(data), events=("end",), tag="item",
+                                  resolve_entities=False, no_network=True)
+        for _, item in context:
+            entries.append(_item_to_entry(item))
+            item.clear()
+            while item.getprevious() is not None:
+                del item.getparent()[0]
+    except etree.XMLSyntaxError:
+        return None
+    if context.root is None or context.root.tag != "rss":
+        return None
+    return feedparser.FeedParserDict(entries=entries, bozo=False)
+
+
+def _parse_bytes(data: bytes, response_headers=None) -> feedparser.FeedParserDict:
+    d = fast_parse(data)
+    return d if d is not None else feedparser.parse(data, response_headers=response_headers)
+
+
+def _cache_feed(url: str, etag: str | None, modified: str | None, d: feedparser.FeedParserDict) -> None:
+    now = monotonic()
+    if url not in _feed_cache and len(_feed_cache) >= _FEED_CACHE_MAX:
+        cached = list(_feed_cache.items())
+        for k, v in cached:
+            if now - v[0] >= FEED_CACHE_TTL_SEC:
+                _feed_cache.pop(k, None)
+        if len(_feed_cache) >= _FEED_CACHE_MAX:
+            _feed_cache.pop(min(cached, key=lambda kv: kv[1][0])[0], None)
+    _feed_cache[url] = (now, etag, modified, d)
+
+
+def load_feed(feed_source: str, http: urllib3.PoolManager):
     if os.path.exists(feed_source):
         with open(feed_source, "rb") as f:
             data = f.read()
-        return feedparser.parse(data)
+        return _parse_bytes(data)
 
     try:
         parsed = urlparse(feed_source)
@@ -21,31 +93,51 @@ def load_feed(feed_source: str):
     except Exception:
         is_url = False
 
-    if is_url:
-        if ALLOW_ONLY_DEFAULT_FEED and feed_source != DEFAULT_FEED:
-            raise ValueError("External feeds are not allowed. Use the default RSS feed only.")
+    if not is_url:
+        return feedparser.parse(feed_source)
+
+    if ALLOW_ONLY_DEFAULT_FEED and feed_source != DEFAULT_FEED:
+        raise ValueError("External feeds are not allowed. Use the default RSS feed only.")
 
-        key = DEFAULT_FEED if ALLOW_ONLY_DEFAULT_FEED else feed_source
-        if not _limiter.allow(key):
-            raise RuntimeError("Rate limit exceeded for RSS fetches. Please try again later.")
+    fetched_at, etag, modified, prev = _feed_cache.get(feed_source, (0.0, None, None, None))
+    if prev is not None and monotonic() - fetched_at < FEED_CACHE_TTL_SEC:
+        return prev
 
-    return feedparser.parse(feed_source)
+    # Revalidating a cached feed is at most one request per TTL and usually a 304,
+    # so only full fetches count against the limit.
+    key = DEFAULT_FEED if ALLOW_ONLY_DEFAULT_FEED else feed_source
+    if prev is None and not _limiter.allow(key):
+        raise RuntimeError("Rate limit exceeded for RSS fetches. Please try again later.")
+
+    headers = dict(http.headers)
+    if prev is not None and etag:
+        headers["If-None-Match"] = etag
+    if prev is not None and modified:
+        headers["If-Modified-Since"] = modified
+    r = http.request("GET", feed_source, headers=headers, timeout=30)
+    if r.status == 304 and prev is not None:
+        _cache_feed(feed_source, etag, modified, prev)
+        return prev
+    raise_for_status(r, feed_source)
+
+    d = _parse_bytes(r.data, response_headers=dict(r.headers))
+    if d.entries:
+        _cache_feed(feed_source, r.headers.get("ETag"), r.headers.get("Last-Modified"), d)
+    return d
 
 
 def pick_image(entry) -> str | None:
-    if getattr(entry, "enclosures", None):
-        for enc in entry.enclosures:
-            if "type" in enc and isinstance(enc["type"], str) and enc["type"].startswith("image/"):
-                return enc.get("href") or enc.get("url")
-    
-    if getattr(entry, "media_content", None):
-        for m in entry.media_content:
-            if "url" in m:
-                return m["url"]
-    
-    if getattr(entry, "links", None):
-        for l in entry.links:
-            if l.get("rel") == "enclosure" and l.get("type", "").startswith("image/"):
-                return l.get("href")
-    
+    for enc in getattr(entry, "enclosures", None) or ():
+        t = enc.get("type")
+        if isinstance(t, str) and t.startswith(_IMG_PREFIX):
+            return enc.get("href") or enc.get("url")
+
+    for m in getattr(entry, "media_content", None) or ():
+        if "url" in m:
+            return m["url"]
+
+    for l in getattr(entry, "links", None) or ():
+        if l.get("rel") == "enclosure" and l.get("type", "").startswith(_IMG_PREFIX):
+            return l.get("href")
+
     return None
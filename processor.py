@@ -1,34 +1,201 @@
-from datetime import date
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
 from pathlib import Path
+from threading import Lock
 from email.utils import parsedate_to_datetime
 from zoneinfo import ZoneInfo
 
-import requests
+import urllib3
 
-from config import IST, UA, HASHTAGS
-from utils import slugify, strip_html, ensure_unique_path, file_ext_from_url, build_caption
+from config import IST, UA, HASHTAGS, DOWNLOAD_WORKERS
+from utils import slugify, strip_html, file_ext_from_url, build_caption, raise_for_status
 from feed_parser import load_feed, pick_image
 from scraper import download_html, extract_article_text
 
+_HTTP = urllib3.PoolManager(
+    num_pools=32,
+    maxsize=max(32, DOWNLOAD_WORKERS),
+    # accept_encoding=True advertises br too when the brotli package is importable
+    headers={"User-Agent": UA, "Accept": "*/*", **urllib3.make_headers(accept_encoding=True)},
+    retries=urllib3.Retry(connect=3, read=3, status=3, redirect=10, backoff_factor=0.3,
+                          status_forcelist=[429, 500, 502, 503, 504]),
+)
+
+
+# Pages larger than this are parsed in a worker process so extraction isn't
+# serialised on the GIL; smaller ones aren't worth the pickling round trip.
+_PROCESS_EXTRACT_MIN = 50_000
+_extract_pool: ProcessPoolExecutor | None = None
+_extract_pool_lock = Lock()
+
+# Feeds list newest first; after this many consecutive entries older than the
+# target day, stop scanning (a few tolerate slightly out-of-order items).
+_OLDER_LOOKAHEAD = 5
+
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+
+
+def _date_fragments(target_date: date) -> tuple[str, ...]:
+    # " DD Mon YYYY" as it appears in RFC 2822 dates, for the target day and its
+    # neighbours: a feed timezone can put an IST-day item on the adjacent date.
+    frags = []
+    for delta in (-1, 0, 1):
+        d = target_date + timedelta(days=delta)
+        mon = _MONTHS[d.month - 1]
+        frags.append(f" {d.day:02d} {mon} {d.year}")
+        if d.day < 10:
+            frags.append(f" {d.day} {mon} {d.year}")
+    return tuple(frags)
+
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            # spawn, not fork: the parent is a threaded web server
+            _extract_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _extract_pool
+
+
+def _open_output(path: Path, overwrite: bool) -> int:
+    # the stem was picked up front, so a fresh stem must not already exist
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_TRUNC if overwrite else os.O_EXCL)
+    return os.open(path, flags, 0o644)
+
+
+def _write_bytes(path: Path, data: bytes, overwrite: bool) -> Path:
+    fd = _open_output(path, overwrite)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    return path
+
+
+def _owns_outputs(txt_path: Path, link: str) -> bool:
+    # the caption is written last and carries the article link on its own line
+    try:
+        with open(txt_path, encoding="utf-8", errors="ignore") as fh:
+            return any(line.strip() == link for line in fh)
+    except OSError:
+        return False
+
+
+def _claim_stem(slug: str, link: str, day_dir: Path, on_disk: set[str],
+                claimed: set[str]) -> tuple[str, bool]:
+    # First of slug, slug-1, ... not taken earlier in this run that is either unused
+    # on disk or already holds this link's outputs; the flag says which.
+    stem, n = slug, 0
+    while True:
+        if stem not in claimed:
+            if stem not in on_disk:
+                return stem, False
+            if _owns_outputs(day_dir / (stem + ".txt"), link):
+                return stem, True
+        n += 1
+        stem = f"{slug}-{n}"
+
+
+def _save_html(link: str, slug: str, http: urllib3.PoolManager, day_dir: Path,
+               overwrite: bool, reuse: bool) -> tuple[bytes | None, str | None, Path]:
+    html_path = day_dir / (slug + ".html")
+    if reuse and html_path.is_file():
+        if (day_dir / (slug + ".md")).is_file():
+            # nothing left to extract, so don't read the page back
+            return None, None, html_path
+        # no HTTP charset for a saved page; lxml falls back to its <meta charset>
+        return html_path.read_bytes(), None, html_path
+    raw_html, charset = download_html(link, http)
+    return raw_html, charset, _write_bytes(html_path, raw_html, overwrite)
+
+
+def _save_markdown(raw_html: bytes, charset: str | None, link: str, slug: str, day_dir: Path,
+                   overwrite: bool, reuse: bool) -> Path:
+    md_path = day_dir / (slug + ".md")
+    if reuse and md_path.is_file():
+        return md_path
+    global _extract_pool
+    extracted_text = None
+    if len(raw_html) > _PROCESS_EXTRACT_MIN:
+        pool = _get_extract_pool()
+        try:
+            extracted_text = pool.submit(extract_article_text, raw_html, link, charset).result()
+        except BrokenProcessPool:
+            # a worker died (OOM, kill); drop the pool so the next call starts a fresh one
+            with _extract_pool_lock:
+                if _extract_pool is pool:
+                    _extract_pool = None
+            pool.shutdown(wait=False)
+    if extracted_text is None:
+        extracted_text = extract_article_text(raw_html, url=link, encoding=charset)
+    return _write_bytes(md_path, extracted_text.encode("utf-8"), overwrite)
+
+
+def _save_image(img_url: str, slug: str, http: urllib3.PoolManager, day_dir: Path,
+                overwrite: bool, reuse: bool) -> Path:
+    ext = file_ext_from_url(img_url)
+    img_path = day_dir / (slug + ext)
+    if reuse and img_path.is_file():
+        return img_path
+    r = http.request("GET", img_url, preload_content=False, timeout=45)
+    try:
+        raise_for_status(r, img_url)
+        fd = _open_output(img_path, overwrite)
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(r, f, length=262144)
+    finally:
+        r.release_conn()
+    return img_path
+
+
+def _save_caption(e, title: str, link: str, slug: str, day_dir: Path, overwrite: bool,
+                  reuse: bool) -> Path:
+    txt_path = day_dir / (slug + ".txt")
+    if reuse and txt_path.is_file():
+        return txt_path
+
+    raw = strip_html(getattr(e, "summary", getattr(e, "description", "")))
+    summary_text = (raw[:900] + "…") if len(raw) > 900 else raw
+
+    caption = build_caption(title, summary_text, link, HASHTAGS)
+    return _write_bytes(txt_path, caption.encode("utf-8"), overwrite)
+
 
 def run_job(*, feed: str, out_root: str | Path, target_date: date, max_items: int | None,
             overwrite: bool):
     out_root = Path(out_root)
     out_root.mkdir(parents=True, exist_ok=True)
 
-    d = load_feed(feed)
+    d = load_feed(feed, _HTTP)
+    frags = _date_fragments(target_date)
     entries = []
+    older = 0
     for e in d.entries:
         if getattr(e, "published", None):
             try:
                 published = e.published
                 if isinstance(published, str):
+                    padded = " " + published.lower()
+                    if not any(f in padded for f in frags):
+                        continue
                     pub = parsedate_to_datetime(published)
                     if pub.tzinfo is None:
                         pub = pub.replace(tzinfo=ZoneInfo("UTC"))
                     pub_ist = pub.astimezone(IST)
                     if pub_ist.date() == target_date:
                         entries.append((pub_ist, e))
+                        older = 0
+                    elif pub_ist.date() < target_date:
+                        older += 1
+                        if older > _OLDER_LOOKAHEAD:
+                            break
             except Exception:
                 continue
 
@@ -40,8 +207,7 @@ def run_job(*, feed: str, out_root: str | Path, target_date: date, max_items: in
     day_dir = out_root / y / m / dday
     day_dir.mkdir(parents=True, exist_ok=True)
 
-    session = requests.Session()
-    session.headers.update({"User-Agent": UA, "Accept": "*/*"})
+    http = _HTTP
 
     results = {
         "dir": str(day_dir.resolve()),
@@ -52,72 +218,86 @@ def run_job(*, feed: str, out_root: str | Path, target_date: date, max_items: in
     if not entries:
         return results
 
-    for pub_ist, e in entries:
-        title = e.title.strip()
-        link = e.link.strip()
-        slug = slugify(title)
-
-        record = {
-            "title": title,
-            "link": link,
-            "slug": slug,
-            "paths": {},
-            "image_saved": False,
-            "errors": []
-        }
-
-        html_path = day_dir / f"{slug}.html"
-        raw_html = ""
-        try:
-            raw_html = download_html(link, session)
-            if html_path.exists() and not overwrite:
-                html_path = ensure_unique_path(html_path)
-            html_path.write_text(raw_html, encoding="utf-8")
-            record["paths"]["html"] = str(html_path.relative_to(out_root))
-        except Exception as ex:
-            record["errors"].append(f"HTML download failed: {ex}")
-
-        extracted_text = ""
-        if raw_html:
-            try:
-                extracted_text = extract_article_text(raw_html, url=link)
-                md_path = day_dir / f"{slug}.md"
-                if md_path.exists() and not overwrite:
-                    md_path = ensure_unique_path(md_path)
-                md_path.write_text(extracted_text, encoding="utf-8")
-                record["paths"]["md"] = str(md_path.relative_to(out_root))
-            except Exception as ex:
-                record["errors"].append(f"Extraction failed: {ex}")
+    # Two-stage pipeline: HTML and image downloads run on the I/O pool, and each
+    # page is handed to the CPU pool for extraction as soon as it arrives, so
+    # parsing overlaps with the downloads still in flight.
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as io_pool, \
+            ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as cpu_pool:
+        jobs = []
+        claimed = set()
+        with os.scandir(day_dir) as it:
+            on_disk = {os.path.splitext(d.name)[0] for d in it}
+        for _, e in entries:
+            title = e.title.strip()
+            link = e.link.strip()
+            img_url = pick_image(e)
+            # One stem per entry, fixed before any stage runs, so titles that slugify
+            # alike ("Same Title!" / "Same Title?") never share or split files.
+            slug, owned = _claim_stem(slugify(title), link, day_dir, on_disk, claimed)
+            claimed.add(slug)
+            reuse = owned and not overwrite
+            write_over = overwrite or owned
+            jobs.append({
+                "entry": e,
+                "overwrite": write_over,
+                "reuse": reuse,
+                "record": {
+                    "title": title,
+                    "link": link,
+                    "slug": slug,
+                    "paths": {},
+                    "image_saved": False,
+                    "errors": []
+                },
+                "html": io_pool.submit(_save_html, link, slug, http, day_dir, write_over, reuse),
+                "image": io_pool.submit(_save_image, img_url, slug, http, day_dir, write_over, reuse)
+                if img_url else None,
+                "md": None,
+                "md_path": None,
+            })
+
+        by_html = {job["html"]: job for job in jobs}
+        for fut in as_completed(by_html):
+            if fut.exception() is not None:
+                continue
+            raw_html, charset, html_path = fut.result()
+            job = by_html[fut]
+            if raw_html is None:
+                job["md_path"] = html_path.with_suffix(".md")
+            elif raw_html:
+                rec = job["record"]
+                job["md"] = cpu_pool.submit(_save_markdown, raw_html, charset, rec["link"], rec["slug"],
+                                            day_dir, job["overwrite"], job["reuse"])
+
+        for job in jobs:
+            record = job["record"]
 
-        img_url = pick_image(e)
-        if img_url:
             try:
-                ext = file_ext_from_url(img_url)
-                img_path = day_dir / f"{slug}{ext}"
-                if img_path.exists() and not overwrite:
-                    img_path = ensure_unique_path(img_path)
-                with session.get(img_url, stream=True, timeout=45) as r:
-                    r.raise_for_status()
-                    with open(img_path, "wb") as f:
-                        for chunk in r.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                record["paths"]["image"] = str(img_path.relative_to(out_root))
-                record["image_saved"] = True
+                _, _, html_path = job["html"].result()
+                record["paths"]["html"] = str(html_path.relative_to(out_root))
             except Exception as ex:
-                record["errors"].append(f"Image download failed: {ex}")
+                record["errors"].append(f"HTML download failed: {ex}")
+
+            if job["md"] is not None:
+                try:
+                    record["paths"]["md"] = str(job["md"].result().relative_to(out_root))
+                except Exception as ex:
+                    record["errors"].append(f"Extraction failed: {ex}")
+            elif job["md_path"] is not None:
+                record["paths"]["md"] = str(job["md_path"].relative_to(out_root))
 
-        raw = strip_html(getattr(e, "summary", getattr(e, "description", "")))
-        summary_text = (raw[:900] + "…") if len(raw) > 900 else raw
+            if job["image"] is not None:
+                try:
+                    record["paths"]["image"] = str(job["image"].result().relative_to(out_root))
+                    record["image_saved"] = True
+                except Exception as ex:
+                    record["errors"].append(f"Image download failed: {ex}")
 
-        caption = build_caption(title, summary_text, link, HASHTAGS)
-        txt_path = day_dir / f"{slug}.txt"
-        if txt_path.exists() and not overwrite:
-            txt_path = ensure_unique_path(txt_path)
-        txt_path.write_text(caption, encoding="utf-8")
-        record["paths"]["txt"] = str(txt_path.relative_to(out_root))
+            txt_path = _save_caption(job["entry"], record["title"], record["link"], record["slug"],
+                                     day_dir, job["overwrite"], job["reuse"])
+            record["paths"]["txt"] = str(txt_path.relative_to(out_root))
 
-        results["items"].append(record)
+            results["items"].append(record)
 
     results["count"] = len(results["items"])
     return results
@@ -1,51 +1,95 @@
 import re
-import requests
-from bs4 import BeautifulSoup
+import urllib3
+import lxml.html
+from lxml.etree import ParserError
 
-def download_html(url: str, session: requests.Session) -> str:
-    r = session.get(url, timeout=45)
-    r.raise_for_status()
-    return r.text
+from utils import raise_for_status
 
-def extract_article_text(html: str, url: str | None = None) -> str:
-    soup = BeautifulSoup(html, "lxml")
+try:
+    from readability import Document as _ReadabilityDoc
+except ImportError:
+    _ReadabilityDoc = None
 
-    art = soup.find("article")
-    if art:
-        txt = art.get_text(" ", strip=True)
+_POST_BODY_RE = re.compile(r"^post-body", re.I)
+_BLOCK_TAGS = ("div", "section", "main", "article", "p")
+_POST_BODY_CLASS_XPATH = (
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' post-body ')"
+    " and contains(concat(' ', normalize-space(@class), ' '), ' entry-content ')]"
+)
+
+def _charset(r: urllib3.BaseHTTPResponse) -> str | None:
+    for param in r.headers.get("Content-Type", "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip("\"' ")
+    return None
+
+def download_html(url: str, http: urllib3.PoolManager) -> tuple[bytes, str | None]:
+    r = http.request("GET", url, timeout=45)
+    raise_for_status(r, url)
+    return r.data, _charset(r)
+
+def _text(el) -> str:
+    return " ".join(t for t in (s.strip() for s in el.itertext()) if t)
+
+def _parse(html: bytes | str, encoding: str | None):
+    parser = None
+    if encoding and isinstance(html, bytes):
+        try:
+            parser = lxml.html.HTMLParser(encoding=encoding)
+        except LookupError:
+            pass
+    try:
+        return lxml.html.fromstring(html, parser=parser)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        return lxml.html.fromstring(html.encode("utf-8"))
+
+def extract_article_text(html: bytes | str, url: str | None = None, encoding: str | None = None) -> str:
+    # Bytes are decoded by lxml itself: with the HTTP charset when the server sent
+    # one, otherwise from the page's <meta charset>.
+    try:
+        root = _parse(html, encoding)
+    except ParserError:
+        return ""
+    for el in root.xpath("//script|//style"):
+        el.drop_tree()
+
+    art = next(root.iter("article"), None)
+    if art is not None:
+        txt = _text(art)
         if len(txt) > 400:
             return txt
 
-    cand = soup.find("div", id=re.compile(r"^post-body", re.I))
-    if cand:
-        txt = cand.get_text(" ", strip=True)
+    cand = next((el for el in root.iter("div") if _POST_BODY_RE.match(el.get("id", ""))), None)
+    if cand is not None:
+        txt = _text(cand)
         if len(txt) > 400:
             return txt
 
-    cand = soup.select_one("div.post-body.entry-content")
-    if cand:
-        txt = cand.get_text(" ", strip=True)
+    cand = next(iter(root.xpath(_POST_BODY_CLASS_XPATH)), None)
+    if cand is not None:
+        txt = _text(cand)
         if len(txt) > 400:
             return txt
 
-    blocks = sorted(
-        (el.get_text(" ", strip=True) for el in soup.find_all(["div", "section", "main", "article", "p"])),
-        key=lambda t: len(t or ""),
-        reverse=True,
-    )
-    for t in blocks:
-        if len(t) > 600:
-            return t
+    # single pass keeping the longest block; no list of every block's text, no sort
+    best = ""
+    for el in root.iter(*_BLOCK_TAGS):
+        t = _text(el)
+        if len(t) > len(best):
+            best = t
+    if len(best) > 600:
+        return best
 
-    try:
-        from readability import Document
-        doc = Document(html)
-        main_html = doc.summary()
-        s2 = BeautifulSoup(main_html, "lxml")
-        t2 = s2.get_text(" ", strip=True)
-        if len(t2) > 200:
-            return t2
-    except Exception:
-        pass
-
-    return soup.get_text(" ", strip=True)
\ No newline at end of file
+    if _ReadabilityDoc is not None:
+        try:
+            doc = _ReadabilityDoc(html)
+            main_html = doc.summary()
+            t2 = _text(lxml.html.fromstring(main_html))
+            if len(t2) > 200:
+                return t2
+        except Exception:
+            pass
+
+    return _text(root)
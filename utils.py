@@ -4,7 +4,25 @@ import html as ihtml
 from pathlib import Path
 from urllib.parse import urlsplit, unquote
 from collections import deque
-from time import time
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
+
+import lxml.html
+import urllib3
+from lxml.etree import ParserError
+
+IMAGE_EXTS = frozenset((".jpg", ".jpeg", ".png", ".webp"))
+
+_SLUG_DROP = re.compile(r"[^\w\s-]")
+_SLUG_COLLAPSE = re.compile(r"[\s_-]+")
+_STRIP_TAG = re.compile(r"<[^>]+>")
+
+
+def raise_for_status(r: urllib3.BaseHTTPResponse, url: str) -> None:
+    if r.status >= 400:
+        kind = "Client" if r.status < 500 else "Server"
+        raise urllib3.exceptions.HTTPError(f"{r.status} {kind} Error: {r.reason} for url: {url}")
 
 
 class RateLimiter:
@@ -12,51 +30,85 @@ class RateLimiter:
     def __init__(self, max_calls: int, window_seconds: int):
         self.max_calls = max_calls
         self.window = window_seconds
-        self._events: dict[str, deque[float]] = {}
+        self._events: dict[str, tuple[deque[float], Lock]] = {}
+        self._lock = Lock()
+        self._next_prune = monotonic() + window_seconds
 
     def allow(self, key: str) -> bool:
-        now = time()
-        dq = self._events.setdefault(key, deque())
-        cutoff = now - self.window
-        while dq and dq[0] < cutoff:
-            dq.popleft()
-        if len(dq) >= self.max_calls:
-            return False
-        dq.append(now)
-        return True
-
-
+        while True:
+            with self._lock:
+                now = monotonic()
+                if now >= self._next_prune:
+                    self._prune(now - self.window)
+                    self._next_prune = now + self.window
+                slot = self._events.get(key)
+                if slot is None:
+                    slot = self._events[key] = (deque(), Lock())
+            dq, lock = slot
+            with lock:
+                if self._events.get(key) is not slot:
+                    # pruned between lookup and lock; retry with a fresh slot
+                    continue
+                # read under the key lock so timestamps are appended in order
+                now = monotonic()
+                cutoff = now - self.window
+                while dq and dq[0] < cutoff:
+                    dq.popleft()
+                if len(dq) >= self.max_calls:
+                    return False
+                dq.append(now)
+                return True
+
+    def _prune(self, cutoff: float) -> None:
+        # Called with self._lock held; drops keys with no events left in the window.
+        for key, (dq, lock) in list(self._events.items()):
+            with lock:
+                if not dq or dq[-1] < cutoff:
+                    del self._events[key]
+
+
+@lru_cache(maxsize=4096)
 def slugify(s: str, maxlen: int = 80) -> str:
     s = s.lower().strip()
-    s = re.sub(r"[^\w\s-]", "", s)
-    s = re.sub(r"[\s_-]+", "-", s)
-    s = re.sub(r"^-+|-+$", "", s)
+    s = _SLUG_DROP.sub("", s)
+    s = _SLUG_COLLAPSE.sub("-", s).strip("-")
     return s[:maxlen].rstrip("-")
 
 
+@lru_cache(maxsize=4096)
 def strip_html(cdata: str) -> str:
     if not cdata:
         return ""
-    text = re.sub(r"<[^>]+>", "", cdata)
-    return ihtml.unescape(text).strip()
+    try:
+        root = lxml.html.fragment_fromstring(cdata, create_parent="div")
+    except (ParserError, ValueError):
+        text = _STRIP_TAG.sub("", cdata)
+        return ihtml.unescape(text).strip()
+    for el in root.xpath(".//script|.//style"):
+        el.drop_tree()
+    return root.text_content().strip()
 
 
 def ensure_unique_path(p: Path) -> Path:
-    if not p.exists():
+    parent = p.parent
+    try:
+        existing = set(os.listdir(parent))
+    except FileNotFoundError:
+        return p
+    if p.name not in existing:
         return p
     stem, suf = p.stem, p.suffix
     i = 1
-    while True:
-        cand = p.with_name(f"{stem}-{i}{suf}")
-        if not cand.exists():
-            return cand
+    while f"{stem}-{i}{suf}" in existing:
         i += 1
+    return parent / f"{stem}-{i}{suf}"
 
 
+@lru_cache(maxsize=4096)
 def file_ext_from_url(u: str) -> str:
     path = unquote(urlsplit(u).path)
     _, ext = os.path.splitext(path)
-    if ext.lower() in (".jpg", ".jpeg", ".png", ".webp"):
+    if ext.lower() in IMAGE_EXTS:
         return ext
     return ".jpg"
 
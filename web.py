@@ -1,31 +1,140 @@
+import os
+import stat
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
-from flask import Flask, request, redirect, url_for, render_template_string, send_from_directory, abort, flash, session
+from flask import Flask, request, redirect, url_for, render_template, send_file, abort, flash, session
 
 from config import APP_TITLE, DEFAULT_FEED, DEFAULT_OUT, FLASK_SECRET, IST
 from processor import run_job
 from templates import INDEX_TEMPLATE, RESULTS_TEMPLATE, BROWSER_TEMPLATE
+from utils import IMAGE_EXTS
 
 app = Flask(__name__)
 app.secret_key = FLASK_SECRET
 
+# Compiled once; render_template accepts Template objects and still applies
+# context processors, unlike calling .render() directly.
+_INDEX_TMPL = app.jinja_env.from_string(INDEX_TEMPLATE)
+_RESULTS_TMPL = app.jinja_env.from_string(RESULTS_TEMPLATE)
+_BROWSER_TMPL = app.jinja_env.from_string(BROWSER_TEMPLATE)
+
 BASE_OUT = Path(DEFAULT_OUT).resolve()
 BASE_OUT.mkdir(parents=True, exist_ok=True)
 
+_BASE_STR = str(BASE_OUT)
+
 def _safe_path(rel_path: str) -> Path:
-    p = (BASE_OUT / rel_path).resolve()
-    if not str(p).startswith(str(BASE_OUT)):
+    # ".." and absolute paths are rejected lexically; realpath then catches
+    # symlinks under BASE_OUT that point outside it.
+    p = os.path.normpath(os.path.join(_BASE_STR, rel_path))
+    if p != _BASE_STR and not p.startswith(_BASE_STR + os.sep):
         raise ValueError("Path escape blocked")
-    return p
+    p = os.path.realpath(p)
+    if p != _BASE_STR and not p.startswith(_BASE_STR + os.sep):
+        raise ValueError("Path escape blocked")
+    return Path(p)
+
+def _article_items(dir_path: str) -> list[dict] | None:
+    # Keyed on the file names plus mtime/size of the caption and markdown files, so
+    # adding/removing files and rewriting a caption in place both invalidate the entry.
+    names = []
+    text_stats = []
+    with os.scandir(dir_path) as it:
+        for d in it:
+            if not d.is_file():
+                continue
+            names.append(d.name)
+            if os.path.splitext(d.name)[1].lower() in (".txt", ".md"):
+                st = d.stat()
+                text_stats.append((d.name, st.st_mtime_ns, st.st_size))
+    if not text_stats:
+        return None
+    return _parse_article_items(dir_path, tuple(sorted(names)), tuple(sorted(text_stats)))
+
+@lru_cache(maxsize=256)
+def _parse_article_items(dir_path: str, names: tuple[str, ...], text_stats: tuple) -> list[dict]:
+    files = [Path(dir_path, n) for n in names]
+    by_slug = {}
+    for f in files:
+        stem = f.stem
+        by_slug.setdefault(stem, []).append(f)
+
+    items = []
+    for slug, fpaths in sorted(by_slug.items()):
+        paths = {}
+        title = slug
+        link = ""
+
+        txt_file = next((fp for fp in fpaths if fp.suffix.lower() == ".txt"), None)
+        md_file = next((fp for fp in fpaths if fp.suffix.lower() == ".md"), None)
+        html_file = next((fp for fp in fpaths if fp.suffix.lower() == ".html"), None)
+        img_file = next((fp for fp in fpaths if fp.suffix.lower() in IMAGE_EXTS), None)
+
+        def relstr(fp):
+            try:
+                return str(fp.relative_to(BASE_OUT))
+            except Exception:
+                return str(fp)
+
+        if html_file:
+            paths["html"] = relstr(html_file)
+        if md_file:
+            paths["md"] = relstr(md_file)
+        if txt_file:
+            paths["txt"] = relstr(txt_file)
+        if img_file:
+            paths["image"] = relstr(img_file)
+
+        src = txt_file or md_file
+        if src:
+            try:
+                # title and link sit at the top of the caption file
+                with open(src, encoding="utf-8", errors="ignore") as fh:
+                    content = fh.read(2048)
+                for line in content.splitlines():
+                    if line.strip():
+                        title = line.strip()
+                        break
+                for line in content.splitlines():
+                    ls = line.strip()
+                    if ls.startswith("http://") or ls.startswith("https://"):
+                        link = ls
+                        break
+            except Exception:
+                pass
+
+        items.append({
+            "title": title,
+            "link": link,
+            "slug": slug,
+            "paths": paths,
+            "image_saved": img_file is not None,
+            "errors": [],
+        })
+
+    return items
+
+def _dir_entries(dir_path: str, relpath: str) -> list[dict]:
+    # DirEntry.is_dir() uses the listing's d_type; only symlinks cost a stat
+    with os.scandir(dir_path) as it:
+        dents = sorted(it, key=lambda d: d.name)
+    entries = []
+    for d in dents:
+        sub = f"{relpath}/{d.name}" if relpath else d.name
+        is_dir = d.is_dir()
+        href = url_for("browse_dir", relpath=sub) if is_dir else url_for("serve_file", relpath=sub)
+        entries.append({"name": d.name, "type": "dir" if is_dir else "file", "href": href})
+    return entries
 
 @app.route("/", methods=["GET"])
 def index():
     today = datetime.now(IST).date().isoformat()
     import secrets
     session['csrf_token'] = secrets.token_urlsafe(16)
-    return render_template_string(
-        INDEX_TEMPLATE,
+    return render_template(
+        _INDEX_TMPL,
         title=APP_TITLE,
         feed=DEFAULT_FEED,
         out_root=str(BASE_OUT),
@@ -68,8 +177,8 @@ def run():
         flash(f"Run failed: {e}")
         return redirect(url_for("index"))
 
-    return render_template_string(
-        RESULTS_TEMPLATE,
+    return render_template(
+        _RESULTS_TMPL,
         title=APP_TITLE,
         target_date=target_date.isoformat(),
         root=res["dir"],
@@ -79,11 +188,8 @@ def run():
 
 @app.route("/o/")
 def browse_root():
-    entries = []
-    for p in sorted(BASE_OUT.iterdir()):
-        href = url_for("browse_dir", relpath=p.name) if p.is_dir() else url_for("serve_file", relpath=p.name)
-        entries.append({"name": p.name, "type": "dir" if p.is_dir() else "file", "href": href})
-    return render_template_string(BROWSER_TEMPLATE, title=APP_TITLE, root=str(BASE_OUT), entries=entries)
+    entries = _dir_entries(_BASE_STR, "")
+    return render_template(_BROWSER_TMPL, title=APP_TITLE, root=str(BASE_OUT), entries=entries)
 
 @app.route("/o/<path:relpath>")
 def browse_dir(relpath):
@@ -91,72 +197,16 @@ def browse_dir(relpath):
         p = _safe_path(relpath)
     except Exception:
         abort(404)
-    if not p.exists():
+    try:
+        st = p.stat()
+    except OSError:
         abort(404)
 
-    if p.is_file():
+    if stat.S_ISREG(st.st_mode):
         return redirect(url_for("serve_file", relpath=relpath))
     
-    files = [c for c in p.iterdir() if c.is_file()]
-    has_article_texts = any(c.suffix.lower() in (".txt", ".md") for c in files)
-
-    if has_article_texts:
-        by_slug = {}
-        for f in files:
-            stem = f.stem
-            by_slug.setdefault(stem, []).append(f)
-
-        items = []
-        for slug, fpaths in sorted(by_slug.items()):
-            paths = {}
-            title = slug
-            link = ""
-
-            txt_file = next((fp for fp in fpaths if fp.suffix.lower() == ".txt"), None)
-            md_file = next((fp for fp in fpaths if fp.suffix.lower() == ".md"), None)
-            html_file = next((fp for fp in fpaths if fp.suffix.lower() == ".html"), None)
-            img_file = next((fp for fp in fpaths if fp.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp")), None)
-
-            def relstr(fp):
-                try:
-                    return str(fp.relative_to(BASE_OUT))
-                except Exception:
-                    return str(fp)
-
-            if html_file:
-                paths["html"] = relstr(html_file)
-            if md_file:
-                paths["md"] = relstr(md_file)
-            if txt_file:
-                paths["txt"] = relstr(txt_file)
-            if img_file:
-                paths["image"] = relstr(img_file)
-
-            src = txt_file or md_file
-            if src and src.exists():
-                try:
-                    content = src.read_text(encoding="utf-8", errors="ignore")
-                    for line in content.splitlines():
-                        if line.strip():
-                            title = line.strip()
-                            break
-                    for line in content.splitlines():
-                        ls = line.strip()
-                        if ls.startswith("http://") or ls.startswith("https://"):
-                            link = ls
-                            break
-                except Exception:
-                    pass
-
-            items.append({
-                "title": title,
-                "link": link,
-                "slug": slug,
-                "paths": paths,
-                "image_saved": img_file is not None,
-                "errors": [],
-            })
-
+    items = _article_items(str(p))
+    if items is not None:
         try:
             relp = p.relative_to(BASE_OUT)
             parts = relp.parts
@@ -167,8 +217,8 @@ def browse_dir(relpath):
         except Exception:
             target_label = str(p.name)
 
-        return render_template_string(
-            RESULTS_TEMPLATE,
+        return render_template(
+            _RESULTS_TMPL,
             title=APP_TITLE,
             target_date=target_label,
             root=str(p),
@@ -176,13 +226,9 @@ def browse_dir(relpath):
             count=len(items),
         )
 
-    entries = []
-    for c in sorted(p.iterdir()):
-        sub = f"{relpath}/{c.name}"
-        href = url_for("browse_dir", relpath=sub) if c.is_dir() else url_for("serve_file", relpath=sub)
-        entries.append({"name": c.name, "type": "dir" if c.is_dir() else "file", "href": href})
+    entries = _dir_entries(str(p), relpath)
 
-    return render_template_string(BROWSER_TEMPLATE, title=APP_TITLE, root=str(p), entries=entries)
+    return render_template(_BROWSER_TMPL, title=APP_TITLE, root=str(p), entries=entries)
 
 
 @app.route("/files/<path:relpath>")
@@ -191,9 +237,12 @@ def serve_file(relpath):
         p = _safe_path(relpath)
     except Exception:
         abort(404)
-    if not p.exists() or not p.is_file():
+    if not p.is_file():
         abort(404)
-    return send_from_directory(directory=str(p.parent), path=p.name, as_attachment=False)
+    # A rerun fetches the same image for a slug, so browsers may keep images for an
+    # hour; captions/markdown still revalidate against the ETag on every view.
+    max_age = 3600 if p.suffix.lower() in IMAGE_EXTS else None
+    return send_file(p, conditional=True, etag=True, max_age=max_age)
 
 
 @app.context_processor